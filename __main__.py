@@ -7,119 +7,147 @@ A implementation of a game of hangman.
 from __future__ import annotations
 
 import json
+import pickle
+from bisect import bisect_left
 from collections import namedtuple
-from os import name, path, system
+from functools import lru_cache
+from heapq import nsmallest
+from operator import itemgetter
+from os import getpid, name, path, remove, replace, system
 from random import choice
 from string import ascii_lowercase
-from types import SimpleNamespace
-from typing import Any, Callable, Dict, List, NamedTuple, Optional, get_type_hints
+from threading import Thread
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple, get_type_hints
 
-from yaml import full_load
+from yaml import load
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
-class HangmanWord:
-    """
-
-    Represents the word to guess in a game of Hangman.
-
-    Attributes
-    ----------
-    word : List[HangmanWord.HangmanChar]
-        list of HangmanChar subclass instances that forms the word
-    """
+_LOWER: FrozenSet[str] = frozenset(ascii_lowercase)
+_WORDS_PATH: str = path.join(path.dirname(path.abspath(__file__)), "words.json")
 
-    class HangmanChar:
-        """
+_preload_thread: Optional[Thread] = None
 
-        Represents one character in the word in a game of Hangman. Can be guessable (alpha char) or non-guessable.
 
-        Attributes
-        ----------
-        char : str
-            string representation of the character
-        guessed : bool
-            whether the player has guessed this character correctly yet
+def _build_words_cache(source: str, cache: str) -> List[Tuple[float, str]]:
+    """Parse a words json file into (frequency, word) tuples sorted by frequency and pickle them to cache."""
+    with open(source, "rb") as file:
+        words: List[Tuple[float, str]] = sorted(
+            map(itemgetter("frequency", "word"), json.loads(file.read())["words"])
+        )
+    # write to a temp file and swap it in so a failed or concurrent write never leaves a partial cache
+    temp: str = f"{cache}.{getpid()}.tmp"
+    try:
+        with open(temp, "wb") as file:
+            pickle.dump(words, file, protocol=pickle.HIGHEST_PROTOCOL)
+        replace(temp, cache)
+    except OSError:
+        try:
+            remove(temp)
+        except OSError:
+            pass
+    return words
+
+
+@lru_cache(maxsize=4)
+def _load_words_cached(source: str) -> List[Tuple[float, str]]:
+    """
+    Return the word list for a words json file, shared between games.
 
-        Properties
-        ----------
-        guessable : bool
-            represents whether the char is and alpha char and thus can be guessed
-        """
-    
-        def __init__(self, char: str) -> None:
+    Reads the pickled cache next to source, rebuilding it if it is missing, older than source or unreadable.
+    The returned list is shared and must not be mutated.
+    """
+    cache: str = path.splitext(source)[0] + ".pkl"
+    if not path.exists(cache) or path.getmtime(cache) < path.getmtime(source):
+        return _build_words_cache(source, cache)
+    try:
+        with open(cache, "rb") as file:
+            words: Any = pickle.load(file)
+        if isinstance(words, list):
+            return words
+    except (pickle.UnpicklingError, EOFError, OSError, ValueError, AttributeError, ImportError, IndexError):
+        pass
+    return _build_words_cache(source, cache)
+
+
+def _preload_words(source: str) -> None:
+    """Start filling the word list cache for source on a background thread."""
+    global _preload_thread
+
+    def preload() -> None:
+        # a failed preload is retried by from_config on the main thread, which reports the error there
+        try:
+            _load_words_cached(source)
+        except Exception:
+            pass
+
+    _preload_thread = Thread(target=preload)
+    _preload_thread.start()
 
-            self.char: str = char
-            self.guessed: bool = False
 
-        @property
-        def guessable(self) -> bool:
-            return self.char in ascii_lowercase
+class HangmanWord:
+    """
 
-        def display(self) -> str:
-            if self.guessable:
-                return self.char if self.guessed else '_'
-            else:
-                return self.char
+    Represents the word to guess in a game of Hangman.
 
-        def __str__(self) -> str:
-            """Return the actual char of the class instance."""
-            return self.char
+    Attributes
+    ----------
+    chars : str
+        the raw word being guessed
+    revealed : bytearray
+        one byte per char, 1 if the char is shown (guessed or not guessable) and 0 if hidden
+    letters : FrozenSet[str]
+        the guessable chars that appear in the word
+    """
 
-        def __repr__(self) -> str:
-            """Return a string representation of class instance."""
-            return f"{self.__class__!r}: {self!s}"
+    __slots__ = ("chars", "revealed", "letters")
 
     def __init__(self, word: str) -> None:
 
-        self.word: List[HangmanWord.HangmanChar] = [self.HangmanChar(char) for char in word]
+        self.chars: str = word
+        self.revealed: bytearray = bytearray(0 if char in _LOWER else 1 for char in word)
+        self.letters: FrozenSet[str] = frozenset(char for char in word if char in _LOWER)
 
     @classmethod
     def from_config(cls, config: NamedTuple) -> HangmanWord:
 
-        words: List = Game._load_file(
-            "words.json",
-            lambda file: json.loads(
-                file.read(),
-                object_hook=lambda d: SimpleNamespace(**d)
-            )
-        ).words
-
-
-
-        choices: List[SimpleNamespace] = sorted(
-            words,
-            key=lambda word: abs(word.frequency - config["word frequency per million"])
-        )[:config["selection range"]]
+        if _preload_thread is not None:
+            _preload_thread.join()
+        words: List[Tuple[float, str]] = _load_words_cached(_WORDS_PATH)
+
+        # words are sorted by frequency, so the closest matches lie within selection range of the insertion point
+        frequency: float = config["word frequency per million"]
+        selection_range: int = config["selection range"]
+        index: int = bisect_left(words, (frequency,))
+        choices: List[Tuple[float, str]] = nsmallest(
+            selection_range,
+            words[max(0, index - selection_range):index + selection_range],
+            key=lambda word: abs(word[0] - frequency)
+        )
 
         while True:
-            word: HangmanWord = cls(choice(choices).word)
+            word: HangmanWord = cls(choice(choices)[1])
             if not config["use words with punctuation"] and not str(word).isalpha():
                 continue
             break
         return word
 
-
-    
-    def get_chars(self) -> list[str]:
-        return [char.char for char in self.word]
-
     def __str__(self) -> str:
-        """Return string as joined array of chars."""
-        return ''.join(self.get_chars())
+        """Return the raw word."""
+        return self.chars
 
     def __repr__(self) -> str:
         """Return a string representation of class instance."""
         return f"{self.__class__!r}: {self!s}"
 
     def display(self) -> str:
-        return ' '.join([char.display() for char in self.word])
+        return ' '.join([char if revealed else '_' for char, revealed in zip(self.chars, self.revealed)])
 
     def has_won(self) -> bool:
-        for char in self.word:
-            if char.guessable:
-                if not char.guessed:
-                    return False
-        return True
+        return all(self.revealed)
 
 
 class Guess:
@@ -134,20 +162,23 @@ class Guess:
     correct : bool
         whether the character is in the word or not
     """
-    
+
+    __slots__ = ("char", "correct")
+
     def __init__(self, char: str) -> None:
         self.char: str = char
         self.correct: Optional[bool] = None
 
     def guess(self, game: Game) -> Optional[bool]:
-        if self.char in [guess.char for guess in game.guesses]:
+        if self.char in game.guessed_chars:
             self.correct = False if game.config["lose life on duplicate guess"] else None
         else:
-            if self.char in game.word.get_chars():
+            if self.char in game.word.letters:
                 self.correct = True
-                for correct_char in game.word.word:
-                    if correct_char.char == self.char:
-                        correct_char.guessed = True
+                index: int = game.word.chars.find(self.char)
+                while index >= 0:
+                    game.word.revealed[index] = 1
+                    index = game.word.chars.find(self.char, index + 1)
             else:
                 self.correct = False
         return self.correct
@@ -173,6 +204,10 @@ class Game:
         the HangmanWord class instance being guessed in this game
     guesses : List[Guess]
         contains all guess history in list format
+    guessed_chars : Set[str]
+        every char guessed so far, for duplicate detection
+    guess_display : str
+        the guess history as shown in the UI, extended as each guess is made
     lives : int
         how many lives the player has left in the current game
     """
@@ -185,6 +220,8 @@ class Game:
 
         self.word = HangmanWord.from_config(self.config)
         self.guesses: List[Guess] = []
+        self.guessed_chars: Set[str] = set()
+        self.guess_display: str = ''
         self.lives = self.config["lives"]
 
     def turn(self) -> Optional[bool]:
@@ -201,18 +238,20 @@ class Game:
         if guess.guess(self) is False:
             self.lives -= 1
         self.guesses.append(guess)
+        self.guessed_chars.add(guess.char)
+        self.guess_display = f"{self.guess_display}, {guess}" if self.guess_display else str(guess)
         return None
 
     @staticmethod
     def get_guess() -> Guess:
         while True:
             char: str = input("guess char: ")
-            if char in ascii_lowercase and char:
+            if char in _LOWER:
                 return Guess(char)
 
     @staticmethod
     def _load_file(filename, hook) -> Any:
-        with open(path.join(path.dirname(__file__), filename)) as file:
+        with open(path.join(path.dirname(__file__), filename), "rb") as file:
             return hook(file)
 
     def start(self) -> None:
@@ -224,12 +263,12 @@ class Game:
         self.__class__.clear()
         print(f"{self.lives} / {self.config['lives']}")
         print(self.word.display())
-        print(', '.join([str(guess) for guess in self.guesses]))
+        print(self.guess_display)
 
     def paint_endgame_UI(self, won: bool = False) -> None:
         self.__class__.clear()
         print("the word was:")
-        print(' '.join(str(self.word)))
+        print(' '.join(self.word.chars))
         print(f"you {'won' if won else 'lost'}")
 
     def __str__(self) -> str:
@@ -241,10 +280,16 @@ class Game:
         return f"{self.__class__.__name__} word:{self.word!r} guesses:{self.guesses!r}"
 
 
-if __name__ == "__main__":
+def main() -> None:
+    """Play a game of hangman with the settings in settings.yml."""
+    _preload_words(_WORDS_PATH)
     game = Game(Game._load_file(
         "settings.yml",
-        lambda file: full_load(file)
+        lambda file: load(file, Loader=SafeLoader)
         )
     )
     game.start()
+
+
+if __name__ == "__main__":
+    main()